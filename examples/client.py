@@ -27,9 +27,9 @@ except:
 
 import board
 import supervisor
-import wifi
 import time
 import iperf
+from wifi_helper import connect
 
 # Get wifi details and more from a secrets.py file
 try:
@@ -38,37 +38,6 @@ except ImportError:
   print("WiFi secrets are kept in secrets.py, please add them there!")
   raise
 
-# --- connect to AP   --------------------------------------------------------
-
-def connect():
-  """ connect to AP with given ssid """
-
-  print(f"connecting to AP {secrets['ssid']} ...")
-  if 'timeout' in secrets:
-    timeout = secrets['timeout']
-  else:
-    timeout = 5
-  if 'retries' in secrets:
-    retries = secrets['retries']
-  else:
-    retries = 3
-
-  state = wifi.radio.connected
-  print(f"  connected: {state}")
-  if not state:
-    for i in range(retries):
-      try:
-        wifi.radio.connect(secrets['ssid'],
-                           secrets['password'],
-                           timeout = timeout
-                           )
-        break
-      except ConnectionError as ex:
-        print(f"{ex}")
-        if i == retries-1:
-          raise
-    print(f"  connected: {wifi.radio.connected}")
-
 # --- main   ------------------------------------------------------------------
 
 # wait for console to catch all messages
@@ -77,7 +46,7 @@ if wait_for_console:
     time.sleep(0.1)
   print(f"running on board {board.board_id}")
 
-connect()
+connect(secrets)
 while True:
   iperf.client(hostname,debug=debug,
                udp=udp,reverse=reverse,length=length,ttime=ttime)
@@ -22,8 +22,10 @@ except:
 import board
 import supervisor
 import wifi
+import time
 import gc
 import iperf
+from wifi_helper import connect
 
 # Get wifi details and more from a secrets.py file
 try:
@@ -44,39 +46,6 @@ def start_ap():
                       password=secrets["ap_password"],
                       authmode=[wifi.AuthMode.PSK,wifi.AuthMode.WPA2])
 
-# --- connect to AP   --------------------------------------------------------
-
-def connect():
-  """ connect to AP with given ssid """
-
-  print("starting station")
-  wifi.radio.start_station()
-  print(f"connecting to AP {secrets['ssid']} ...")
-  if 'timeout' in secrets:
-    timeout = secrets['timeout']
-  else:
-    timeout = 5
-  if 'retries' in secrets:
-    retries = secrets['retries']
-  else:
-    retries = 3
-
-  state = wifi.radio.connected
-  print(f"  connected: {state}")
-  if not state:
-    for i in range(retries):
-      try:
-        wifi.radio.connect(secrets['ssid'],
-                           secrets['password'],
-                           timeout = timeout
-                           )
-        break
-      except ConnectionError as ex:
-        print(f"  {ex}")
-        if i == retries-1:
-          raise
-    print(f"  connected: {wifi.radio.connected}")
-
 # --- main   ------------------------------------------------------------------
 
 # wait for console to catch all messages
@@ -89,7 +58,9 @@ if run_ap:
   start_ap()
   print(f"starting server on {wifi.radio.ipv4_address_ap}")
 else:
-  connect()
+  print("starting station")
+  wifi.radio.start_station()
+  connect(secrets)
   print(f"starting server on {wifi.radio.ipv4_address}")
 
 while True:
@@ -0,0 +1,38 @@
+# -----------------------------------------------------------------------------
+# CircuitPython iperf3-library.
+#
+# Helper for the examples: connect to an AP. Copy to your device together
+# with the example program.
+#
+# Website: https://github.com/bablokb/circuitpython-iperf
+#
+# -----------------------------------------------------------------------------
+
+import wifi
+
+# --- connect to AP   --------------------------------------------------------
+
+def connect(secrets, timeout=5, retries=3):
+  """ connect to AP with given ssid (timeout/retries from secrets win) """
+
+  print(f"connecting to AP {secrets['ssid']} ...")
+  timeout = secrets.get('timeout', timeout)
+  retries = secrets.get('retries', retries)
+
+  state = wifi.radio.connected
+  print(f"  connected: {state}")
+  if state:
+    return
+
+  for _ in range(retries):
+    try:
+      wifi.radio.connect(secrets['ssid'],
+                         secrets['password'],
+                         timeout = timeout
+                         )
+      print(f"  connected: {wifi.radio.connected}")
+      return
+    except ConnectionError as ex:
+      print(f"  {ex}")
+  else:
+    raise ConnectionError(f"could not connect to AP {secrets['ssid']}")
@@ -22,10 +22,10 @@ Copyright (c) 2018-2019 Damien P. George
 Supported modes: server & client, TCP & UDP, normal & reverse
 """
 
-import os, struct
+import os, struct, array, errno
 import time, select, wifi
 from socketpool import SocketPool
-import json
+# json is only needed at test start/end and imported on demand
 
 # add some functions not available in CircuitPython
 if hasattr(time,'monotonic_ns'):
@@ -51,11 +51,23 @@ else:
         diff = ((diff + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
         return diff
 
-def pollable_is_sock(pollable, sock):
-    return pollable[0] == sock
+# Main loop of server() and client(): the data socket is non-blocking and
+# each round first tries the data operation. Stats.update() runs every
+# round but only reads the clock every _UPDATE_MASK+1 calls, so interval
+# boundaries slip by at most _UPDATE_MASK rounds. The control socket is
+# polled every _POLL_EVERY rounds without timeout, and with the pacing
+# timeout (Stats.max_dt_ms()) if the data operation fails with EAGAIN.
+
+# max. number of back-to-back sends per round
+_SEND_BATCH = 8
+# max. number of data-rounds between two polls of the control socket
+_POLL_EVERY = 16
+# Stats.update() only checks the clock on every 64th call
+_UPDATE_MASK = 63
 
 # iperf3 cookie size, last byte is null byte
 COOKIE_SIZE = 37
+_COOKIE_CHARS = b'abcdefghijklmnopqrstuvwxyz234567'
 
 # iperf3 commands
 TEST_START = 1
@@ -78,31 +90,50 @@ cmd_string = {
     IPERF_DONE: 'IPERF_DONE',
     }
 
+# preallocated single-byte messages for the commands
+_CMD = {cmd: bytes([cmd]) for cmd in cmd_string}
+
+_UNITS = ('', 'K', 'M', 'G')
+
+# results-JSON with fixed schema: bytes, errors, packets, end_time
+_RESULTS_FMT = ('{"cpu_util_total":1,"cpu_util_user":0.5,"cpu_util_system":0.5,'
+                '"sender_has_retransmits":1,"congestion_used":"cubic",'
+                '"streams":[{"id":1,"bytes":%d,"retransmits":0,"jitter":0,'
+                '"errors":%d,"packets":%d,"start_time":0,"end_time":%f}]}')
+
 def fmt_size(val, div):
-    for mult in ('', 'K', 'M', 'G'):
-        if val < 10:
-            return '% 5.2f %s' % (val, mult)
-        elif val < 100:
-            return '% 5.1f %s' % (val, mult)
-        elif mult == 'G' or val < 1000:
-            return '% 5.0f %s' % (val, mult)
-        else:
-            val /= div
+    unit = 0
+    while val >= 1000 and unit < 3:
+        val /= div
+        unit += 1
+    prec = 2 if val < 10 else 1 if val < 100 else 0
+    return '% 5.*f %s' % (prec, val, _UNITS[unit])
+
+# indices into Stats._c: num bytes, num packets, num lost packets,
+# each for the total run (0) and for the current interval (1)
+_NB0 = 0
+_NB1 = 1
+_NP0 = 2
+_NP1 = 3
+_NM0 = 4
+_NM1 = 5
 
 class Stats:
     def __init__(self, param):
         # pacing_timer is in us, convert to our resolution
-        self.pacing_timer = param['pacing_timer'] * (TICKS_PER_SEC/1e6)
+        # (integer arithmetic only, many MCUs lack a hardware FPU)
+        self.pacing_timer = int(param['pacing_timer'] * TICKS_PER_SEC // 1_000_000)
+        self._ms_div = TICKS_PER_SEC // 1000
         self.udp = param.get('udp', False)
         self.reverse = param.get('reverse', False)
         self.running = False
+        self._skip = 0
 
     def start(self):
         self.running = True
+        self._skip = 0
         self.t0 = self.t1 = ticks()
-        self.nb0 = self.nb1 = 0 # num bytes
-        self.np0 = self.np1 = 0 # num packets
-        self.nm0 = self.nm1 = 0 # num lost packets
+        self._c = array.array('q', [0] * 6) # counters, see _NB0 ... _NM1
         if self.udp:
             if self.reverse:
                 extra = '         Jitter    Lost/Total Datagrams'
@@ -117,22 +148,24 @@ class Stats:
             return -1
         return max(0,
                    (self.pacing_timer - ticks_diff(ticks(), self.t1)) //
-                   (TICKS_PER_SEC/1000)
+                   self._ms_div
                    )
 
     def add_bytes(self, n):
         if not self.running:
             return
-        self.nb0 += n
-        self.nb1 += n
-        self.np0 += 1
-        self.np1 += 1
+        c = self._c
+        c[_NB0] += n
+        c[_NB1] += n
+        c[_NP0] += 1
+        c[_NP1] += 1
 
     def add_lost_packets(self, n):
-        self.np0 += n
-        self.np1 += n
-        self.nm0 += n
-        self.nm1 += n
+        c = self._c
+        c[_NP0] += n
+        c[_NP1] += n
+        c[_NM0] += n
+        c[_NM1] += n
 
     def print_line(self, ta, tb, nb, np, nm, extra=''):
         dt = tb - ta
@@ -147,16 +180,21 @@ class Stats:
     def update(self, final=False):
         if not self.running:
             return
+        # wrap the counter to keep it a small int
+        self._skip = (self._skip + 1) & _UPDATE_MASK
+        if not final and self._skip:
+            return
         t2 = ticks()
         dt = ticks_diff(t2, self.t1)
         if final or dt > self.pacing_timer:
             ta = ticks_diff(self.t1, self.t0) * TICKS_PER_SEC
             tb = ticks_diff(t2, self.t0) * TICKS_PER_SEC
-            #self.print_line(ta, tb, self.nb1, self.np1, self.nm1)
+            c = self._c
+            #self.print_line(ta, tb, c[_NB1], c[_NP1], c[_NM1])
             self.t1 = t2
-            self.nb1 = 0
-            self.np1 = 0
-            self.nm1 = 0
+            c[_NB1] = 0
+            c[_NP1] = 0
+            c[_NM1] = 0
 
     def stop(self):
         self.update(True)
@@ -164,8 +202,9 @@ class Stats:
         self.t3 = ticks()
         dt = ticks_diff(self.t3, self.t0)
         print('- ' * 30)
+        c = self._c
         self.print_line(0, dt / TICKS_PER_SEC,
-                        self.nb0, self.np0, self.nm0, '  sender')
+                        c[_NB0], c[_NP0], c[_NM0], '  sender')
 
     def report_receiver(self, stats):
         st = stats['streams'][0]
@@ -174,34 +213,73 @@ class Stats:
         return
 
 def recvn(s, n):
-    data = b''
-    buf = bytearray(min(n,8192))
-    while len(data) < n:
-        n_bytes = s.recv_into(buf)
-        data += buf[:n_bytes]
+    data = bytearray(n)
+    mv = memoryview(data)
+    off = 0
+    while off < n:
+        off += s.recv_into(mv[off:])
     return data
 
-def recvinto(s, buf):
-    if hasattr(s, 'readinto'):
-        return s.readinto(buf)
-    else:
-        return s.recv_into(buf)
-
-def recvninto(s, buf):
-    if hasattr(s, 'readinto'):
-        n = s.readinto(buf)
-        assert n == len(buf)
-    else:
-        mv = memoryview(buf)
-        off = 0
-        while off < len(buf):
-            off += s.recv_into(mv[off:])
+# scratch buffer shared by all control-plane receives
+_SCRATCH_SIZE = 8192
+_SCRATCH = bytearray(_SCRATCH_SIZE)
+_SCRATCH_MV = memoryview(_SCRATCH)
+
+def recvn_into(s, n):
+    # the returned view is only valid until the next call
+    assert n <= _SCRATCH_SIZE
+    mv = _SCRATCH_MV[:n]
+    off = 0
+    while off < n:
+        off += s.recv_into(mv[off:])
+    return mv
+
+# UDP datagram header: sec, usec, packet-id
+_HDR = '>III'
+_HDR_ID_OFFSET = 8
+_HDR_ID = '>I'
+
+# big-endian length prefix of the JSON messages
+_U32 = '>I'
+_LEN_BUF = bytearray(4)
+_LEN_MV = memoryview(_LEN_BUF)
+
+def _recv_u32(s):
+    off = 0
+    while off < 4:
+        off += s.recv_into(_LEN_MV[off:])
+    return struct.unpack_from(_U32, _LEN_BUF, 0)[0]
+
+def _send_u32(s, n):
+    struct.pack_into(_U32, _LEN_BUF, 0, n)
+    s.sendall(_LEN_BUF)
+
+# payload buffer, content is irrelevant for the measurement
+_DATA_BUF = bytearray()
+
+def _get_data_buf(n):
+    if n > len(_DATA_BUF):
+        _DATA_BUF.extend(b'iperf3!!' * ((n - len(_DATA_BUF) + 7) // 8))
+    return memoryview(_DATA_BUF)[:n]
+
+def send_batch(s, buf, add_bytes):
+    # EAGAIN on the first send is passed on to the caller,
+    # later on it just ends the batch
+    add_bytes(s.send(buf))
+    for _ in range(_SEND_BATCH - 1):
+        try:
+            n = s.send(buf)
+        except OSError as ex:
+            if ex.errno == errno.EAGAIN:
+                return
+            raise
+        add_bytes(n)
 
 def make_cookie():
-    cookie_chars = b'abcdefghijklmnopqrstuvwxyz234567'
-    cookie = bytearray(COOKIE_SIZE)
-    for i, x in enumerate(os.urandom(COOKIE_SIZE - 1)):
-        cookie[i] = cookie_chars[x & 31]
+    # CircuitPython's bytes has no translate(), so map the random bytes
+    # in a single comprehension and append the terminating null byte
+    cookie = bytearray(_COOKIE_CHARS[x & 31] for x in os.urandom(COOKIE_SIZE - 1))
+    cookie.append(0)
     return cookie
 
 def server(debug=False):
@@ -223,24 +301,25 @@ def server(debug=False):
         print(cookie)
 
     # Ask for parameters
-    s_ctrl.sendall(bytes([PARAM_EXCHANGE]))
+    s_ctrl.sendall(_CMD[PARAM_EXCHANGE])
 
     # Get parameters
-    n = struct.unpack('>I', recvn(s_ctrl, 4))[0]
-    param = recvn(s_ctrl, n)
-    param = json.loads(str(param, 'ascii'))
+    n = _recv_u32(s_ctrl)
+    import json
+    param = json.loads(str(bytes(recvn_into(s_ctrl, n)), 'ascii'))
     if debug:
         print(param)
     reverse = param.get('reverse', False)
+    param_len = int(param['len'])
 
     # Ask to create streams
-    s_ctrl.sendall(bytes([CREATE_STREAMS]))
+    s_ctrl.sendall(_CMD[CREATE_STREAMS])
 
     if param.get('tcp', False):
         # Accept stream
         s_data, addr = s_listen.accept()
         print('Accepted connection:', addr)
-        recvn(s_data, COOKIE_SIZE)
+        recvn_into(s_data, COOKIE_SIZE)
     elif param.get('udp', False):
         # Close TCP connection and open UDP "connection"
         s_listen.close()
@@ -252,12 +331,14 @@ def server(debug=False):
         assert False
 
     # Start test
-    s_ctrl.sendall(bytes([TEST_START]))
+    s_ctrl.sendall(_CMD[TEST_START])
 
     # Run test
-    s_ctrl.sendall(bytes([TEST_RUNNING]))
+    s_ctrl.sendall(_CMD[TEST_RUNNING])
 
-    # Read data, and wait for client to send TEST_END
+    # Read data, and wait for client to send TEST_END. The data socket is
+    # non-blocking and only polled if it would block
+    s_data.setblocking(False)
     poll = select.poll()
     poll.register(s_ctrl, select.POLLIN)
     if reverse:
@@ -267,23 +348,45 @@ def server(debug=False):
     stats = Stats(param)
     stats.start()
     running = True
-    data_buf = bytearray(os.urandom(param['len']))
+    data_buf = _get_data_buf(param_len)
+
+    # local aliases save a global/attribute lookup per packet
+    _poll = poll.poll
+    _max_dt_ms = stats.max_dt_ms
+    _update = stats.update
+    _add_bytes = stats.add_bytes
+    _send_batch = send_batch
+    if hasattr(s_data, 'readinto'):
+        recv = s_data.readinto
+    else:
+        recv = s_data.recv_into
+
+    # main loop, see _POLL_EVERY
+    rounds = 0
     while running:
-        for pollable in poll.poll(stats.max_dt_ms()):
-            if pollable_is_sock(pollable, s_ctrl):
-                cmd = recvn(s_ctrl, 1)[0]
+        try:
+            if reverse:
+                _send_batch(s_data, data_buf, _add_bytes)
+            else:
+                _add_bytes(recv(data_buf))
+            rounds += 1
+            timeout = 0
+        except OSError as ex:
+            if ex.errno != errno.EAGAIN:
+                raise
+            timeout = _max_dt_ms()
+            rounds = _POLL_EVERY
+        _update()
+        if rounds < _POLL_EVERY:
+            continue
+        rounds = 0
+        for pollable in _poll(timeout):
+            if pollable[0] is s_ctrl:
+                cmd = recvn_into(s_ctrl, 1)[0]
                 if debug:
                     print(cmd_string.get(cmd, 'UNKNOWN_COMMAND'))
                 if cmd == TEST_END:
                     running = False
-            elif pollable_is_sock(pollable, s_data):
-                if reverse:
-                    n = s_data.send(data_buf)
-                    stats.add_bytes(n)
-                else:
-                    recvninto(s_data, data_buf)
-                    stats.add_bytes(len(data_buf))
-        stats.update()
 
     # Need to continue writing so other side doesn't get blocked waiting for data
     if reverse:
@@ -291,42 +394,26 @@ def server(debug=False):
     stats.stop()
 
     # Ask to exchange results
-    s_ctrl.sendall(bytes([EXCHANGE_RESULTS]))
+    s_ctrl.sendall(_CMD[EXCHANGE_RESULTS])
 
     # Get client results
-    n = struct.unpack('>I', recvn(s_ctrl, 4))[0]
-    results = recvn(s_ctrl, n)
-    results = json.loads(str(results, 'ascii'))
+    n = _recv_u32(s_ctrl)
+    results = json.loads(str(bytes(recvn_into(s_ctrl, n)), 'ascii'))
     if debug:
         print(results)
 
     # Send our results
-    results = { 
-        'cpu_util_total': 1,
-        'cpu_util_user': 0.5,
-        'cpu_util_system': 0.5,
-        'sender_has_retransmits': 1,
-        'congestion_used': 'cubic',
-        'streams': [{
-            'id': 1,
-            'bytes': stats.nb0,
-            'retransmits': 0,
-            'jitter': 0,
-            'errors': 0,
-            'packets': stats.np0,
-            'start_time': 0,
-            'end_time': ticks_diff(stats.t3, stats.t0) / TICKS_PER_SEC
-        }]
-    }
-    results = json.dumps(results)
-    s_ctrl.sendall(struct.pack('>I', len(results))) 
-    s_ctrl.sendall(bytes(results, 'ascii'))
+    results = bytes(_RESULTS_FMT % (
+        stats._c[_NB0], 0, stats._c[_NP0],
+        ticks_diff(stats.t3, stats.t0) / TICKS_PER_SEC), 'ascii')
+    _send_u32(s_ctrl, len(results))
+    s_ctrl.sendall(results)
 
     # Ask to display results
-    s_ctrl.sendall(bytes([DISPLAY_RESULTS]))
+    s_ctrl.sendall(_CMD[DISPLAY_RESULTS])
 
     # Wait for client to send IPERF_DONE
-    cmd = recvn(s_ctrl, 1)[0]
+    cmd = recvn_into(s_ctrl, 1)[0]
     assert cmd == IPERF_DONE
 
     # Close all sockets
@@ -350,11 +437,15 @@ def client(host, debug=False, udp=False, reverse=False,
 
     if udp:
         param['udp'] = True
-        param['len'] = 1500 - 42 if length is None else length
-        udp_interval = TICKS_PER_SEC * 8 * param['len'] // bandwidth
+        param_len = 1500 - 42 if length is None else length
+        # ticks*bits per datagram: pacing counts datagrams, so no
+        # per-datagram interval is needed (it would round to 0 for
+        # small datagrams or high bandwidths with ms-resolution)
+        udp_bits = TICKS_PER_SEC * 8 * param_len
     else:
         param['tcp'] = True
-        param['len'] =  3000 if length is None else length
+        param_len = 3000 if length is None else length
+    param['len'] = param_len
 
     if reverse:
         param['reverse'] = True
@@ -380,52 +471,89 @@ def client(host, debug=False, udp=False, reverse=False,
     poll = select.poll()
     poll.register(s_ctrl, select.POLLIN)
     s_data = None
+    recv = None # recv-method of s_data, resolved in CREATE_STREAMS
     start = None
     udp_packet_id = 0
+
+    # local aliases for the hot path, as in server()
+    _ticks = ticks
+    _ticks_diff = ticks_diff
+    _poll = poll.poll
+    _max_dt_ms = stats.max_dt_ms
+    _update = stats.update
+    _add_bytes = stats.add_bytes
+    _send_batch = send_batch
+    _pack_into = struct.pack_into
+    _unpack_from = struct.unpack_from
+
+    # data handlers, one per mode: the mode is fixed for the whole test,
+    # so it is resolved once in CREATE_STREAMS and not per packet.
+    # The data socket is non-blocking, so the handlers raise EAGAIN
+    # before changing any state if no data can be sent/received
+    def tcp_send(s, buf, t):
+        _send_batch(s, buf, _add_bytes)
+
+    def tcp_recv(s, buf, t):
+        _add_bytes(recv(buf))
+
+    def udp_send(s, buf, t):
+        nonlocal udp_packet_id
+        # number of datagrams due since start for the requested bandwidth
+        due = _ticks_diff(t, start) * bandwidth // udp_bits
+        #print('UDP send', udp_packet_id, due)
+        for _ in range(_SEND_BATCH):
+            if udp_packet_id >= due:
+                return
+            _pack_into(_HDR, buf, 0, t // TICKS_PER_SEC, t % TICKS_PER_SEC, udp_packet_id + 1)
+            n = s.sendto(buf, ai[-1])
+            udp_packet_id += 1
+            _add_bytes(n)
+
+    def udp_recv(s, buf, t):
+        nonlocal udp_packet_id
+        n = recv(buf)
+        # only the packet-id is evaluated
+        udp_in_id = _unpack_from(_HDR_ID, buf, _HDR_ID_OFFSET)[0]
+        if udp_in_id != udp_packet_id + 1:
+            stats.add_lost_packets(udp_in_id - (udp_packet_id + 1))
+        udp_packet_id = udp_in_id
+        _add_bytes(n)
+
+    # main loop, see _POLL_EVERY (data rounds start with TEST_START/RUNNING)
+    rounds = 0
     while True:
-        for pollable in poll.poll(stats.max_dt_ms()):
-            if pollable_is_sock(pollable, s_data):
-                # Data socket is writable/readable
-                t = ticks()
-                if ticks_diff(t, start) > ticks_end:
-                    if reverse:
-                        # Continue to drain any incoming data
-                        recvinto(s_data, buf)
+        if start is None:
+            timeout = _max_dt_ms()
+        else:
+            t = _ticks()
+            try:
+                if _ticks_diff(t, start) > ticks_end:
                     if stats.running:
                         # End of run
-                        s_ctrl.sendall(bytes([TEST_END]))
+                        s_ctrl.sendall(_CMD[TEST_END])
                         stats.stop()
+                    if reverse:
+                        # Continue to drain any incoming data
+                        recv(buf)
                 else:
-                    # Send/receiver data
-                    if udp:
-                        if reverse:
-                            recvninto(s_data, buf)
-                            udp_in_sec, udp_in_usec, udp_in_id = struct.unpack_from('>III', buf, 0)
-                            #print(udp_in_sec, udp_in_usec, udp_in_id)
-                            if udp_in_id != udp_packet_id + 1:
-                                stats.add_lost_packets(udp_in_id - (udp_packet_id + 1))
-                            udp_packet_id = udp_in_id
-                            stats.add_bytes(len(buf))
-                        else:
-                            #print('UDP send', udp_last_send, t, udp_interval)
-                            if t - udp_last_send > udp_interval:
-                                udp_last_send += udp_interval
-                                udp_packet_id += 1
-                                struct.pack_into('>III', buf, 0, t // TICKS_PER_SEC, t % TICKS_PER_SEC, udp_packet_id)
-                                n = s_data.sendto(buf, ai[-1])
-                                stats.add_bytes(n)
-                    else:
-                        if reverse:
-                            recvninto(s_data, buf)
-                            n = len(buf)
-                        else:
-                            #print('TCP send', len(buf))
-                            n = s_data.send(buf)
-                        stats.add_bytes(n)
-
-            elif pollable_is_sock(pollable, s_ctrl):
+                    # Send/receive data
+                    data_handler(s_data, buf, t)
+                rounds += 1
+                timeout = 0
+            except OSError as ex:
+                if ex.errno != errno.EAGAIN:
+                    raise
+                timeout = _max_dt_ms()
+                rounds = _POLL_EVERY
+            _update()
+            if rounds < _POLL_EVERY:
+                continue
+            rounds = 0
+
+        for pollable in _poll(timeout):
+            if pollable[0] is s_ctrl:
                 # Receive command
-                cmd = recvn(s_ctrl, 1)[0]
+                cmd = recvn_into(s_ctrl, 1)[0]
                 if debug:
                     print(cmd_string.get(cmd, 'UNKNOWN_COMMAND'))
                 if cmd == TEST_START:
@@ -439,59 +567,52 @@ def client(host, debug=False, udp=False, reverse=False,
                         # Start sending data now
                         poll.register(s_data, select.POLLOUT)
                         start = ticks()
-                        if udp:
-                            udp_last_send = start - udp_interval
                         stats.start()
                 elif cmd == PARAM_EXCHANGE:
+                    import json
                     param_j = json.dumps(param)
-                    s_ctrl.sendall(struct.pack('>I', len(param_j))) 
+                    _send_u32(s_ctrl, len(param_j))
                     s_ctrl.sendall(bytes(param_j, 'ascii'))
                 elif cmd == CREATE_STREAMS:
                     if udp:
                         s_data = pool.socket(ai[0], SocketPool.SOCK_DGRAM)
                         s_data.sendto(struct.pack('<I', 123456789), ai[-1])
-                        recvn(s_data, 4) # get dummy response from server (=987654321)
+                        recvn_into(s_data, 4) # get dummy response from server (=987654321)
                     else:
                         s_data = pool.socket(ai[0], SocketPool.SOCK_STREAM)
                         s_data.connect(ai[-1])
                         s_data.sendall(cookie)
-                    buf = bytearray(os.urandom(param['len']))
+                    s_data.setblocking(False)
+                    if hasattr(s_data, 'readinto'):
+                        recv = s_data.readinto
+                    else:
+                        recv = s_data.recv_into
+                    buf = _get_data_buf(param_len)
+                    if udp:
+                        data_handler = udp_recv if reverse else udp_send
+                    else:
+                        data_handler = tcp_recv if reverse else tcp_send
                 elif cmd == EXCHANGE_RESULTS:
                     # Close data socket now that server knows we are finished, to prevent it flooding us
                     poll.unregister(s_data)
                     s_data.close()
                     s_data = None
-
-                    results = {
-                        'cpu_util_total': 1,
-                        'cpu_util_user': 0.5,
-                        'cpu_util_system': 0.5,
-                        'sender_has_retransmits': 1,
-                        'congestion_used': 'cubic',
-                        'streams': [{
-                            'id': 1,
-                            'bytes': stats.nb0,
-                            'retransmits': 0,
-                            'jitter': 0,
-                            'errors': stats.nm0,
-                            'packets': stats.np0,
-                            'start_time': 0,
-                            'end_time': ticks_diff(stats.t3, stats.t0) / TICKS_PER_SEC
-                        }]
-                    }
-                    results = json.dumps(results)
-                    s_ctrl.sendall(struct.pack('>I', len(results))) 
-                    s_ctrl.sendall(bytes(results, 'ascii'))
-
-                    n = struct.unpack('>I', recvn(s_ctrl, 4))[0]
-                    results = recvn(s_ctrl, n)
-                    results = json.loads(str(results, 'ascii'))
+                    recv = None
+                    start = None
+
+                    results = bytes(_RESULTS_FMT % (
+                        stats._c[_NB0], stats._c[_NM0], stats._c[_NP0],
+                        ticks_diff(stats.t3, stats.t0) / TICKS_PER_SEC), 'ascii')
+                    _send_u32(s_ctrl, len(results))
+                    s_ctrl.sendall(results)
+
+                    n = _recv_u32(s_ctrl)
+                    import json
+                    results = json.loads(str(bytes(recvn_into(s_ctrl, n)), 'ascii'))
                     stats.report_receiver(results)
 
                 elif cmd == DISPLAY_RESULTS:
-                    s_ctrl.sendall(bytes([IPERF_DONE]))
+                    s_ctrl.sendall(_CMD[IPERF_DONE])
                     s_ctrl.close()
                     time.sleep(1) # delay so server is ready for any subsequent client connections
                     return
-
-        stats.update()